@@ -0,0 +1,42 @@
+"""Add expense filter and description search indexes
+
+Revision ID: 0a9d4c6e3b18
+Revises: f27c9a4b1d63
+Create Date: 2026-10-17 15:32:08.461927
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a9d4c6e3b18'
+down_revision: Union[str, None] = 'f27c9a4b1d63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_expenses_user_id_category_date', 'expenses', ['user_id', 'category', 'date'], unique=False)
+
+    # Trigram index lets ILIKE '%q%' use an index; other databases fall back to a LIKE scan
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index(
+            'ix_expenses_description_trgm',
+            'expenses',
+            ['description'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'description': 'gin_trgm_ops'}
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_expenses_description_trgm', table_name='expenses')
+    op.drop_index('ix_expenses_user_id_category_date', table_name='expenses')
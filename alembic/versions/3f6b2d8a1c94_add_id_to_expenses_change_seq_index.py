@@ -0,0 +1,31 @@
+"""Add id to the expenses change sequence index
+
+Revision ID: 3f6b2d8a1c94
+Revises: 0a9d4c6e3b18
+Create Date: 2026-10-17 18:12:40.519306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6b2d8a1c94'
+down_revision: Union[str, None] = '0a9d4c6e3b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bulk imports share one change_seq, so delta sync pages on (change_seq, id)
+    op.create_index('ix_expenses_user_id_change_seq_id', 'expenses', ['user_id', 'change_seq', 'id'], unique=False)
+    op.drop_index('ix_expenses_user_id_change_seq', table_name='expenses')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_expenses_user_id_change_seq', 'expenses', ['user_id', 'change_seq'], unique=False)
+    op.drop_index('ix_expenses_user_id_change_seq_id', table_name='expenses')
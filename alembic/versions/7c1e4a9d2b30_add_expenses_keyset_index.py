@@ -0,0 +1,33 @@
+"""Add expenses keyset pagination index
+
+Revision ID: 7c1e4a9d2b30
+Revises: 29503e12e4ff
+Create Date: 2026-10-17 09:12:44.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e4a9d2b30'
+down_revision: Union[str, None] = '29503e12e4ff'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_expenses_user_id_date_id',
+        'expenses',
+        ['user_id', sa.text('date DESC'), 'id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_expenses_user_id_date_id', table_name='expenses')
@@ -0,0 +1,37 @@
+"""Add expense_rollups table
+
+Revision ID: b3f58e1c6a47
+Revises: 7c1e4a9d2b30
+Create Date: 2026-10-17 10:03:27.540912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f58e1c6a47'
+down_revision: Union[str, None] = '7c1e4a9d2b30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('expense_rollups',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('period', sa.Date(), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=False),
+    sa.Column('total', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'period', 'category')
+    )
+    # Existing expenses are loaded with `flask backfill-rollups`
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('expense_rollups')
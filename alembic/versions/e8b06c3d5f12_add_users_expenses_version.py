@@ -0,0 +1,28 @@
+"""Add users.expenses_version
+
+Revision ID: e8b06c3d5f12
+Revises: d41a2f7e9c85
+Create Date: 2026-10-17 12:40:51.872036
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b06c3d5f12'
+down_revision: Union[str, None] = 'd41a2f7e9c85'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('expenses_version', sa.BigInteger(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'expenses_version')
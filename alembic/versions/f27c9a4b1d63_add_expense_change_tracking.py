@@ -0,0 +1,41 @@
+"""Add expense change sequence and tombstones
+
+Revision ID: f27c9a4b1d63
+Revises: e8b06c3d5f12
+Create Date: 2026-10-17 13:55:16.227390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f27c9a4b1d63'
+down_revision: Union[str, None] = 'e8b06c3d5f12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('expenses', sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False))
+    op.create_index('ix_expenses_user_id_change_seq', 'expenses', ['user_id', 'change_seq'], unique=False)
+    op.create_table('expense_tombstones',
+    sa.Column('expense_id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('change_seq', sa.BigInteger(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('expense_id')
+    )
+    op.create_index('ix_expense_tombstones_user_id_change_seq', 'expense_tombstones', ['user_id', 'change_seq'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_expense_tombstones_user_id_change_seq', table_name='expense_tombstones')
+    op.drop_table('expense_tombstones')
+    op.drop_index('ix_expenses_user_id_change_seq', table_name='expenses')
+    op.drop_column('expenses', 'change_seq')
@@ -1,34 +1,124 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity
-from flask_migrate import Migrate
-from flask_bcrypt import Bcrypt
+from flask_jwt_extended import JWTManager, jwt_required, create_access_token
 from datetime import timedelta, datetime
 from dotenv import load_dotenv
 import os
 import uuid
 
-from extensions import db
-from models import User, Expense
+import click
+from sqlalchemy.exc import IntegrityError
+
+from auth import current_user_id
+from extensions import db, password_hasher, replica_router
+from models import User, Expense, ExpenseImport, ExpenseTombstone
+from bulk import BulkBodyError, TooManyRows, ingest, iter_rows
+from expense_cache import ResponseCache, bump_expenses_version, conditional_expenses, get_expenses_version
+from exports import csv_chunks, gzip_chunks, iter_partitions, ndjson_chunks
+from filters import apply_expense_filters
+from group_commit import GroupCommitTimeout, GroupCommitter
+from metrics import TimedQueuePool, metrics
+from pagination import InvalidCursor, after_cursor, changes_page, keyset_order, keyset_page
+from passwords import PasswordHasherBusy
+from rollups import GROUP_BY_CHOICES, backfill_rollups_command, record_expense, summarize
+from routing import use_replica
+from serializers import ExpenseJSONProvider, encode_expense_rows, expense_select
 
 load_dotenv()
 
+def engine_options(database_uri):
+    # SQLite uses its own single-connection pools, so pool tuning only applies to server databases
+    if database_uri.startswith("sqlite"):
+        return {}
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": int(os.getenv('DB_POOL_SIZE', 5)),
+        "max_overflow": int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        "pool_timeout": int(os.getenv('DB_POOL_TIMEOUT', 30)),
+        "pool_recycle": int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        "pool_pre_ping": os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+    }
+
+EXPORT_FORMATS = {
+    "csv": (csv_chunks, "text/csv"),
+    "ndjson": (ndjson_chunks, "application/x-ndjson"),
+}
+
+def parse_date_range(args):
+    date_from = args.get("from")
+    date_to = args.get("to")
+    date_from = datetime.strptime(date_from, "%Y-%m-%d").date() if date_from else None
+    date_to = datetime.strptime(date_to, "%Y-%m-%d").date() if date_to else None
+    return date_from, date_to
+
 def create_app():
     app = Flask(__name__)
 
     # Set up app configurations
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL') or f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    if os.getenv('DATABASE_REPLICA_URL'):
+        app.config['SQLALCHEMY_BINDS'] = {
+            'replica': {
+                'url': os.getenv('DATABASE_REPLICA_URL'),
+                **engine_options(os.getenv('DATABASE_REPLICA_URL'))
+            }
+        }
+    app.config['REPLICA_RETRY_SECONDS'] = float(os.getenv('REPLICA_RETRY_SECONDS', 30))
+    app.config['REPLICA_MAX_LAG_SECONDS'] = float(os.getenv('REPLICA_MAX_LAG_SECONDS')) if os.getenv('REPLICA_MAX_LAG_SECONDS') else None
+    app.config['SLOW_QUERY_MS'] = float(os.getenv('SLOW_QUERY_MS')) if os.getenv('SLOW_QUERY_MS') else None
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'your-secret-key')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+    app.config['EXPENSES_MAX_PAGE_SIZE'] = int(os.getenv('EXPENSES_MAX_PAGE_SIZE', 500))
+    app.config['EXPENSES_STREAM_BATCH_SIZE'] = int(os.getenv('EXPENSES_STREAM_BATCH_SIZE', 1000))
+    app.config['EXPENSES_BULK_MAX_ROWS'] = int(os.getenv('EXPENSES_BULK_MAX_ROWS', 50000))
+    app.config['EXPENSES_BULK_CHUNK_SIZE'] = int(os.getenv('EXPENSES_BULK_CHUNK_SIZE', 1000))
+    app.config['EXPENSES_GROUP_COMMIT'] = os.getenv('EXPENSES_GROUP_COMMIT', 'false').lower() in ('1', 'true', 'yes')
+    app.config['EXPENSES_GROUP_COMMIT_WINDOW_MS'] = float(os.getenv('EXPENSES_GROUP_COMMIT_WINDOW_MS', 5))
+    app.config['EXPENSES_GROUP_COMMIT_MAX_BATCH'] = int(os.getenv('EXPENSES_GROUP_COMMIT_MAX_BATCH', 100))
+    app.config['EXPENSES_CACHE_MAX_BYTES'] = int(os.getenv('EXPENSES_CACHE_MAX_BYTES', 0))
+    app.config['BCRYPT_LOG_ROUNDS'] = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    app.config['BCRYPT_MAX_WORKERS'] = int(os.getenv('BCRYPT_MAX_WORKERS', 4))
+    app.config['BCRYPT_MAX_QUEUE'] = int(os.getenv('BCRYPT_MAX_QUEUE', 16))
+
+    # Expense.to_dict() responses use the same ISO dates as the tuple serializer
+    app.json = ExpenseJSONProvider(app)
 
     # Initialize extensions
+    metrics.init_app(app)
     db.init_app(app)
-    migrate = Migrate(app, db)
-    bcrypt = Bcrypt(app)
+    # Flask-Migrate (and alembic) are only needed for `flask db ...`, not when serving
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        migrate = Migrate(app, db)
+    password_hasher.init_app(app)
+    replica_router.init_app(app)
     jwt = JWTManager(app)
     CORS(app)
 
+    app.cli.add_command(backfill_rollups_command)
+
+    @app.errorhandler(PasswordHasherBusy)
+    def password_hasher_busy(e):
+        response = jsonify({"error": "Server busy, please retry shortly"})
+        response.headers["Retry-After"] = "1"
+        return response, 503
+
+    if app.config['EXPENSES_CACHE_MAX_BYTES'] > 0:
+        app.extensions['expense_cache'] = ResponseCache(app.config['EXPENSES_CACHE_MAX_BYTES'])
+
+    group_committer = None
+    if app.config['EXPENSES_GROUP_COMMIT']:
+        group_committer = GroupCommitter(
+            app,
+            window_ms=app.config['EXPENSES_GROUP_COMMIT_WINDOW_MS'],
+            max_batch=app.config['EXPENSES_GROUP_COMMIT_MAX_BATCH']
+        )
+        app.extensions['group_commit'] = group_committer
+        metrics.add_collector("group_commit", group_committer.stats)
+    metrics.add_collector("password_hasher", password_hasher.stats)
+
     # Register user
     @app.route("/register", methods=["POST"])
     def register():
@@ -49,7 +139,7 @@ def create_app():
         try:
             db.session.add(new_user)
             db.session.commit()
-            access_token = create_access_token(identity={"id": str(new_user.id), "email": new_user.email})
+            access_token = create_access_token(identity=str(new_user.id), additional_claims={"email": new_user.email})
             return jsonify({"message": "User registered successfully", "token": access_token}), 201
         except Exception as e:
             db.session.rollback()
@@ -65,6 +155,15 @@ def create_app():
         user = User.query.filter_by(email=email).first()
 
         if user and user.check_password(password):
+            # Upgrade hashes made with a different BCRYPT_LOG_ROUNDS while we have the password
+            if user.needs_rehash():
+                try:
+                    user.set_password(password)
+                    db.session.commit()
+                    password_hasher.stats["rehashes"] += 1
+                except Exception:
+                    db.session.rollback()
+
             access_token = create_access_token(identity=str(user.id))  
 
             return jsonify({"token": access_token}), 200
@@ -76,7 +175,7 @@ def create_app():
     @jwt_required()
     def add_expense():
         data = request.json
-        user_id = get_jwt_identity()["id"]
+        user_id = current_user_id()
 
         try:
             amount = float(data.get("amount"))
@@ -87,7 +186,7 @@ def create_app():
             if not amount or not category or not date:
                 return jsonify({"error": "Amount, category, and date are required"}), 400
 
-            new_expense = Expense(
+            values = dict(
                 id=uuid.uuid4(),
                 user_id=user_id,
                 amount=amount,
@@ -96,22 +195,260 @@ def create_app():
                 date=date
             )
 
+            if group_committer is not None:
+                expense = group_committer.submit(values)
+                return jsonify({"message": "Expense added successfully", "expense": expense}), 201
+
+            new_expense = Expense(**values, change_seq=bump_expenses_version(user_id))
             db.session.add(new_expense)
+            record_expense(user_id, date, category, amount)
             db.session.commit()
             
             return jsonify({"message": "Expense added successfully", "expense": new_expense.to_dict()}), 201
 
+        except GroupCommitTimeout:
+            response = jsonify({"error": "Server busy, please retry shortly"})
+            response.headers["Retry-After"] = "1"
+            return response, 503
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 500
+
+
+    @app.route("/expenses/<uuid:expense_id>", methods=["PUT"])
+    @jwt_required()
+    def update_expense(expense_id):
+        data = request.json
+        user_id = current_user_id()
+
+        expense = Expense.query.filter_by(id=expense_id, user_id=user_id).first()
+        if not expense:
+            return jsonify({"error": "Expense not found"}), 404
+
+        try:
+            amount = float(data.get("amount"))
+            category = data.get("category")
+            description = data.get("description", "")
+            date = datetime.strptime(data.get("date"), "%Y-%m-%d").date()
+
+            if not amount or not category or not date:
+                return jsonify({"error": "Amount, category, and date are required"}), 400
+
+            record_expense(user_id, expense.date, expense.category, -expense.amount, -1)
+            expense.amount = amount
+            expense.category = category
+            expense.description = description
+            expense.date = date
+            expense.change_seq = bump_expenses_version(user_id)
+            record_expense(user_id, date, category, amount)
+            db.session.commit()
+
+            return jsonify({"message": "Expense updated successfully", "expense": expense.to_dict()}), 200
+
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 500
+
+
+    @app.route("/expenses/<uuid:expense_id>", methods=["DELETE"])
+    @jwt_required()
+    def delete_expense(expense_id):
+        user_id = current_user_id()
+
+        expense = Expense.query.filter_by(id=expense_id, user_id=user_id).first()
+        if not expense:
+            return jsonify({"error": "Expense not found"}), 404
+
+        try:
+            record_expense(user_id, expense.date, expense.category, -expense.amount, -1)
+            db.session.add(ExpenseTombstone(
+                expense_id=expense.id,
+                user_id=user_id,
+                change_seq=bump_expenses_version(user_id)
+            ))
+            db.session.delete(expense)
+            db.session.commit()
+
+            return jsonify({"message": "Expense deleted successfully"}), 200
+
         except Exception as e:
             db.session.rollback()
             return jsonify({"error": str(e)}), 500
 
+
+    @app.route("/expenses/bulk", methods=["POST"])
+    @jwt_required()
+    def add_expenses_bulk():
+        user_id = current_user_id()
+        idempotency_key = request.headers.get("Idempotency-Key")
+
+        if idempotency_key:
+            previous = ExpenseImport.query.filter_by(user_id=user_id, idempotency_key=idempotency_key).first()
+            if previous:
+                return jsonify(previous.result), 200
+
+        try:
+            inserted, errors = ingest(
+                user_id,
+                iter_rows(request.stream, request.mimetype),
+                app.config['EXPENSES_BULK_MAX_ROWS'],
+                app.config['EXPENSES_BULK_CHUNK_SIZE'],
+                change_seq=bump_expenses_version(user_id)
+            )
+            result = {"inserted": inserted, "errors": errors}
+            if idempotency_key:
+                db.session.add(ExpenseImport(user_id=user_id, idempotency_key=idempotency_key, result=result))
+            db.session.commit()
+            return jsonify(result), 201
+
+        except TooManyRows as e:
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 413
+        except (BulkBodyError, UnicodeDecodeError) as e:
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 400
+        except IntegrityError:
+            db.session.rollback()
+            # A concurrent retry with the same key committed first
+            if idempotency_key:
+                previous = ExpenseImport.query.filter_by(user_id=user_id, idempotency_key=idempotency_key).first()
+                if previous:
+                    return jsonify(previous.result), 200
+            return jsonify({"error": "Could not import expenses"}), 409
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("Bulk import failed for user %s", user_id)
+            return jsonify({"error": "Could not import expenses"}), 500
+
     
     @app.route("/expenses", methods=["GET"])
     @jwt_required()
+    @use_replica
+    @conditional_expenses
     def get_expenses():
-        user_id = get_jwt_identity()["id"]
-        expenses = Expense.query.filter_by(user_id=user_id).order_by(Expense.date.desc()).all()
-        return jsonify([expense.to_dict() for expense in expenses]), 200
+        user_id = current_user_id()
+        cursor = request.args.get("cursor")
+        limit = request.args.get("limit")
+
+        try:
+            stmt = apply_expense_filters(expense_select().where(Expense.user_id == user_id), request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if request.accept_mimetypes.best_match(["application/json", "application/x-ndjson"]) == "application/x-ndjson":
+            stmt = keyset_order(stmt)
+            if cursor:
+                try:
+                    stmt = after_cursor(stmt, cursor)
+                except InvalidCursor as e:
+                    return jsonify({"error": str(e)}), 400
+            return Response(stream_with_context(stream_expenses(stmt)), mimetype="application/x-ndjson")
+
+        # Unpaginated listing kept for clients that don't send limit/cursor
+        if limit is None and cursor is None:
+            rows = db.session.execute(stmt.order_by(Expense.date.desc())).all()
+            return Response(encode_expense_rows(rows), mimetype="application/json"), 200
+
+        max_limit = app.config['EXPENSES_MAX_PAGE_SIZE']
+        try:
+            limit = int(limit) if limit is not None else max_limit
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        if limit < 1:
+            return jsonify({"error": "limit must be positive"}), 400
+        limit = min(limit, max_limit)
+
+        try:
+            rows, next_cursor = keyset_page(stmt, limit, cursor)
+        except InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
+
+        body = f'{{"expenses":{encode_expense_rows(rows)},"next":{app.json.dumps(next_cursor)}}}'
+        return Response(body, mimetype="application/json"), 200
+
+    @app.route("/expenses/summary", methods=["GET"])
+    @jwt_required()
+    @use_replica
+    @conditional_expenses
+    def get_expense_summary():
+        user_id = current_user_id()
+        group_by = request.args.get("group_by", "category")
+
+        if group_by not in GROUP_BY_CHOICES:
+            return jsonify({"error": f"group_by must be one of: {', '.join(GROUP_BY_CHOICES)}"}), 400
+
+        try:
+            date_from, date_to = parse_date_range(request.args)
+        except ValueError:
+            return jsonify({"error": "from and to must be dates in YYYY-MM-DD format"}), 400
+
+        summary = summarize(user_id, group_by, date_from, date_to)
+        return jsonify({"group_by": group_by, "summary": summary}), 200
+
+    @app.route("/expenses/changes", methods=["GET"])
+    @jwt_required()
+    @use_replica
+    @conditional_expenses
+    def get_expense_changes():
+        user_id = current_user_id()
+
+        since = request.args.get("since")
+        max_limit = app.config['EXPENSES_MAX_PAGE_SIZE']
+        try:
+            limit = int(request.args.get("limit", max_limit))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        if limit < 1:
+            return jsonify({"error": "limit must be positive"}), 400
+        limit = min(limit, max_limit)
+
+        # Everything up to the current version has committed, so it bounds this page
+        version = get_expenses_version(user_id)
+        try:
+            rows, deleted, cursor, has_more = changes_page(user_id, version, limit, since)
+        except InvalidCursor:
+            return jsonify({"error": "since must be a cursor returned by this endpoint"}), 400
+
+        body = (
+            f'{{"changed":{encode_expense_rows(rows)},'
+            f'"deleted":{app.json.dumps([str(expense_id) for expense_id in deleted])},'
+            f'"cursor":{app.json.dumps(cursor)},"has_more":{app.json.dumps(has_more)}}}'
+        )
+        return Response(body, mimetype="application/json"), 200
+
+    @app.route("/expenses/export", methods=["GET"])
+    @jwt_required()
+    @use_replica
+    def export_expenses():
+        user_id = current_user_id()
+        export_format = request.args.get("format", "csv")
+
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+        try:
+            stmt = apply_expense_filters(expense_select().where(Expense.user_id == user_id), request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        stmt = keyset_order(stmt)
+
+        encode, mimetype = EXPORT_FORMATS[export_format]
+        body = encode(stream_partitions(stmt))
+        headers = {"Content-Disposition": f"attachment; filename=expenses.{export_format}"}
+        # q=0 means the client refuses gzip, and werkzeug keeps it in the list
+        if request.accept_encodings["gzip"] > 0:
+            body = gzip_chunks(body)
+            headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+
+        return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
+
+    def stream_expenses(stmt):
+        return ndjson_chunks(stream_partitions(stmt))
+
+    def stream_partitions(stmt):
+        # yield_per keeps a server-side cursor open and fetches rows in batches
+        return iter_partitions(stmt, app.config['EXPENSES_STREAM_BATCH_SIZE'])
 
     return app
 
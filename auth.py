@@ -0,0 +1,8 @@
+import uuid
+
+from flask_jwt_extended import get_jwt_identity
+
+
+def current_user_id():
+    """Return the authenticated user's id (the token's string subject) as a UUID."""
+    return uuid.UUID(get_jwt_identity())
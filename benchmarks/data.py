@@ -0,0 +1,46 @@
+import random
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert, text
+
+from extensions import db
+from models import Expense, User
+
+CATEGORIES = ["food", "rent", "travel", "utilities", "fun", "health", "groceries", "transport"]
+WORDS = ["coffee", "lunch", "taxi", "cinema", "rent", "groceries", "pharmacy", "train", "dinner", "books"]
+
+
+def create_user(email, name="bench", password_hash="x"):
+    user = User(name=name, email=email, password_hash=password_hash)
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def seed_expenses(user_id, rows, batch_size=10000, start=date(2015, 1, 1), seed=0):
+    """Insert `rows` synthetic expenses for a user using batched executemany."""
+    rng = random.Random(seed)
+    batch = []
+    for i in range(rows):
+        batch.append({
+            "id": uuid.UUID(int=rng.getrandbits(128), version=4),
+            "user_id": user_id,
+            "amount": Decimal(rng.randint(100, 100000)) / 100,
+            "category": rng.choice(CATEGORIES),
+            "description": f"{rng.choice(WORDS)} {rng.choice(WORDS)} #{i}",
+            "date": start + timedelta(days=rng.randrange(3650)),
+            "change_seq": 1,
+        })
+        if len(batch) == batch_size:
+            db.session.execute(insert(Expense), batch)
+            batch.clear()
+    if batch:
+        db.session.execute(insert(Expense), batch)
+    db.session.commit()
+
+    # Give the SQLite planner statistics so it picks the composite indexes
+    if db.engine.dialect.name == "sqlite":
+        db.session.execute(text("ANALYZE"))
+        db.session.commit()
@@ -0,0 +1,99 @@
+"""Time filtered first-page queries on the expense list for one large user.
+
+Usage: python -m benchmarks.filter_bench [--rows 1000000] [--database-url sqlite:////tmp/filter_bench.db]
+
+The database is seeded on the first run and reused afterwards when it
+already holds the requested number of rows.
+"""
+import argparse
+import statistics
+import time
+
+from flask import Flask
+from sqlalchemy import func, inspect, select, text
+
+from benchmarks.data import create_user, seed_expenses
+from extensions import db
+from filters import apply_expense_filters
+from models import Expense, User
+from pagination import keyset_page
+from serializers import expense_select
+
+CASES = [
+    ("unfiltered", {}),
+    ("category", {"category": "travel"}),
+    ("date range", {"from": "2020-03-01", "to": "2020-03-31"}),
+    ("category + date range", {"category": "food", "from": "2019-01-01", "to": "2019-06-30"}),
+    ("amount range", {"min_amount": "100", "max_amount": "150"}),
+    ("search q (common)", {"q": "pharmacy"}),
+    ("search q (1 match)", {"q": "#999999"}),
+]
+
+
+def ensure_data(rows):
+    user_id = db.session.scalar(select(User.id).where(User.email == "filter-bench@example.com"))
+    if user_id is not None:
+        existing = db.session.scalar(select(func.count()).select_from(Expense).where(Expense.user_id == user_id))
+        if existing == rows:
+            return user_id
+        db.drop_all()
+        db.create_all()
+    user_id = create_user("filter-bench@example.com")
+    started = time.perf_counter()
+    seed_expenses(user_id, rows)
+    print(f"seeded {rows:,} rows in {time.perf_counter() - started:.1f}s")
+    return user_id
+
+
+def ensure_indexes():
+    """Add indexes missing from a dataset seeded before they were declared.
+
+    New indexes have no planner statistics yet, so ANALYZE afterwards and
+    reconnect; otherwise SQLite may prefer an index it knows nothing about.
+    """
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        db.session.commit()
+    existing = {index["name"] for index in inspect(db.engine).get_indexes("expenses")}
+    for index in Expense.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    if {index["name"] for index in inspect(db.engine).get_indexes("expenses")} != existing:
+        db.session.execute(text("ANALYZE expenses"))
+        db.session.commit()
+        # SQLite connections keep the statistics they loaded when opened
+        db.session.remove()
+        db.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url", default="sqlite:////tmp/filter_bench.db")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = args.database_url
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        user_id = ensure_data(args.rows)
+        ensure_indexes()
+
+        print(f"{'case':<24} {'p50 ms':>8} {'p95 ms':>8} {'rows':>6}")
+        for name, params in CASES:
+            stmt = apply_expense_filters(expense_select().where(Expense.user_id == user_id), params)
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                rows, _ = keyset_page(stmt, args.limit)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(f"{name:<24} {statistics.median(timings):>8.2f} {p95:>8.2f} {len(rows):>6}")
+
+
+if __name__ == "__main__":
+    main()
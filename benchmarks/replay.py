@@ -0,0 +1,322 @@
+"""Replay a JSONL request trace against the app and report per-route performance.
+
+Usage:
+  python -m benchmarks.replay --rows 10000 --output base.json
+  python -m benchmarks.replay --rows 10000 --compare base.json
+  python -m benchmarks.replay --target http://127.0.0.1:8000 --database-url postgresql://...
+
+By default requests go through create_app() and the Flask test client. With
+--target they are sent over HTTP to an already running server (e.g. a local
+gunicorn) that must use the same DATABASE_URL, JWT_SECRET_KEY and
+BCRYPT_LOG_ROUNDS as this process.
+
+Each trace line is an object with "name", "method", "path" and optionally
+"json" and "auth" (send the virtual user's bearer token). Strings may use
+{email}, {password}, {unique} and {today}; see benchmarks/traces/mobile.jsonl.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import date, datetime, timezone
+
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import Engine
+
+from benchmarks.data import seed_expenses
+
+DEFAULT_TRACE = os.path.join(os.path.dirname(__file__), "traces", "mobile.jsonl")
+PASSWORD = "replay-password"
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(Engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def parse_rows(value):
+    return SCALES.get(value.lower()) or int(value)
+
+
+def load_trace(path):
+    with open(path, encoding="utf-8") as trace:
+        return [json.loads(line) for line in trace if line.strip()]
+
+
+def fill(value, replacements):
+    if isinstance(value, str):
+        return value.format(**replacements)
+    if isinstance(value, dict):
+        return {key: fill(item, replacements) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill(item, replacements) for item in value]
+    return value
+
+
+def prepare_data(app, users, rows, reseed=False):
+    """Seed `users` bench users sharing `rows` expenses.
+
+    An existing dataset is reused when it has the same users and at least
+    `rows` expenses; replayed writes add a few rows per run.
+    """
+    from extensions import db, password_hasher
+    from models import Expense, User
+    from rollups import backfill_rollups
+
+    with app.app_context():
+        db.create_all()
+        user_ids = db.session.scalars(
+            select(User.id).where(User.email.like("bench-%@example.com")).order_by(User.email)
+        ).all()
+        existing = db.session.scalar(
+            select(func.count()).select_from(Expense).where(Expense.user_id.in_(user_ids))
+        ) if user_ids else 0
+
+        if reseed or len(user_ids) != users or existing < rows:
+            db.drop_all()
+            db.create_all()
+            password_hash = password_hasher.hash(PASSWORD)
+            new_users = [
+                User(name=f"Bench {i}", email=f"bench-{i:06d}@example.com", password_hash=password_hash)
+                for i in range(users)
+            ]
+            db.session.add_all(new_users)
+            db.session.commit()
+            user_ids = [user.id for user in new_users]
+
+            started = time.perf_counter()
+            per_user, remainder = divmod(rows, users)
+            for i, user_id in enumerate(user_ids):
+                seed_expenses(user_id, per_user + (1 if i < remainder else 0), seed=i)
+            backfill_rollups()
+            print(f"seeded {users:,} users and {rows:,} expenses in {time.perf_counter() - started:.1f}s")
+
+        return [
+            (db.session.get(User, user_id).email, user_id)
+            for user_id in user_ids
+        ]
+
+
+def issue_tokens(app, bench_users):
+    from flask_jwt_extended import create_access_token
+
+    with app.app_context():
+        return [
+            (email, create_access_token(identity=str(user_id), expires_delta=False))
+            for email, user_id in bench_users
+        ]
+
+
+def test_client_sender(app):
+    client = app.test_client()
+
+    def send(method, path, body, headers):
+        response = client.open(path, method=method, json=body, headers=headers)
+        response.get_data()
+        response.close()
+        return response.status_code
+    return send
+
+
+def http_sender(base_url):
+    def send(method, path, body, headers):
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode("utf-8")
+            headers = {**headers, "Content-Type": "application/json"}
+        request = urllib.request.Request(base_url.rstrip("/") + path, data=data, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+    return send
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def replay(trace, send, tokens, iterations, counter):
+    samples = {}
+    unique = itertools.count()
+    virtual_users = itertools.cycle(tokens)
+    started = time.perf_counter()
+
+    for _ in range(iterations):
+        for entry in trace:
+            email, token = next(virtual_users)
+            replacements = {
+                "email": email,
+                "password": PASSWORD,
+                "unique": f"{os.getpid()}-{next(unique)}",
+                "today": date.today().isoformat(),
+            }
+            headers = {"Authorization": f"Bearer {token}"} if entry.get("auth") else {}
+            body = fill(entry.get("json"), replacements)
+            path = fill(entry["path"], replacements)
+
+            queries_before = counter.count if counter else 0
+            request_started = time.perf_counter()
+            status = send(entry["method"], path, body, headers)
+            elapsed = time.perf_counter() - request_started
+
+            route = samples.setdefault(entry["name"], {"latencies": [], "errors": 0, "queries": 0})
+            route["latencies"].append(elapsed)
+            route["queries"] += (counter.count - queries_before) if counter else 0
+            if status >= 400:
+                route["errors"] += 1
+
+    return samples, time.perf_counter() - started
+
+
+def summarize(samples, wall_seconds, in_process):
+    """Per-route stats; throughput is each route's share of the run's wall time.
+
+    The trace is replayed sequentially, so the routes' throughputs add up
+    to the whole run's requests per second.
+    """
+    routes = {}
+    for name, route in samples.items():
+        latencies = sorted(route["latencies"])
+        count = len(latencies)
+        routes[name] = {
+            "requests": count,
+            "errors": route["errors"],
+            "throughput_rps": count / wall_seconds,
+            "mean_ms": sum(latencies) / count * 1000,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "queries_per_request": route["queries"] / count if in_process else None,
+        }
+    return routes
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results):
+    print(f"{'route':<26} {'reqs':>6} {'err':>4} {'req/s':>9} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>7}")
+    for name, route in results["routes"].items():
+        queries = route["queries_per_request"]
+        print(
+            f"{name:<26} {route['requests']:>6} {route['errors']:>4} {route['throughput_rps']:>9.1f} "
+            f"{route['mean_ms']:>8.2f} {route['p50_ms']:>8.2f} {route['p95_ms']:>8.2f} {route['p99_ms']:>8.2f} "
+            f"{'-' if queries is None else f'{queries:.1f}':>7}"
+        )
+    meta = results["meta"]
+    rss = meta["peak_rss_kb"]
+    print(
+        f"\n{meta['requests']} requests in {meta['wall_seconds']:.1f}s ({meta['throughput_rps']:.1f} req/s)"
+        + ("" if rss is None else f", peak RSS {rss / 1024:.0f} MiB")
+    )
+
+
+def compare(baseline, current, max_regression):
+    """Print p95 changes per route; return the routes whose p95 regressed."""
+    regressions = []
+    print(f"\n{'route':<26} {'p95 before':>10} {'p95 after':>10} {'change':>8}")
+    for name, route in current["routes"].items():
+        before = baseline["routes"].get(name)
+        if before is None:
+            continue
+        change = route["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0
+        flag = ""
+        if change > max_regression:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<26} {before['p95_ms']:>10.2f} {route['p95_ms']:>10.2f} {change:>+8.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trace", default=DEFAULT_TRACE)
+    parser.add_argument("--rows", type=parse_rows, default="10k", help="total expenses: 10k, 1m, 10m or a number")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=20, help="passes over the trace")
+    parser.add_argument("--database-url", default="sqlite:////tmp/replay_bench.db")
+    parser.add_argument("--reseed", action="store_true", help="rebuild the dataset even if one already exists")
+    parser.add_argument("--bcrypt-rounds", type=int, help="override BCRYPT_LOG_ROUNDS for seeded users and the app")
+    parser.add_argument("--target", help="base URL of a running server; default is the in-process test client")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed p95 increase before failing")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    if args.bcrypt_rounds:
+        os.environ["BCRYPT_LOG_ROUNDS"] = str(args.bcrypt_rounds)
+
+    from app import create_app
+
+    app = create_app()
+    tokens = issue_tokens(app, prepare_data(app, args.users, args.rows, args.reseed))
+    trace = load_trace(args.trace)
+
+    in_process = args.target is None
+    counter = QueryCounter() if in_process else None
+    send = test_client_sender(app) if in_process else http_sender(args.target)
+
+    samples, wall_seconds = replay(trace, send, tokens, args.iterations, counter)
+    requests = sum(len(route["latencies"]) for route in samples.values())
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "trace": os.path.basename(args.trace),
+            "target": args.target or "test-client",
+            "database": app.config["SQLALCHEMY_DATABASE_URI"].split(":", 1)[0],
+            "rows": args.rows,
+            "users": args.users,
+            "iterations": args.iterations,
+            "wall_seconds": wall_seconds,
+            "requests": requests,
+            "throughput_rps": requests / wall_seconds,
+            # ru_maxrss is the process high-water mark (KiB on Linux), so it is reported once per run
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if in_process else None,
+            "python": platform.python_version(),
+        },
+        "routes": summarize(samples, wall_seconds, in_process),
+    }
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+        print(f"\nresults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline:
+            regressions = compare(json.load(baseline), results, args.max_regression)
+        if regressions:
+            print(f"\np95 regressed by more than {args.max_regression:.0%} on: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
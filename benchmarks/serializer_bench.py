@@ -0,0 +1,58 @@
+"""Compare ORM + to_dict() serialization with the column-tuple fast path.
+
+Usage: python -m benchmarks.serializer_bench [--rows 100000] [--repeat 3]
+"""
+import argparse
+import time
+
+from flask import Flask
+
+from benchmarks.data import create_user, seed_expenses
+from extensions import db
+from models import Expense
+from serializers import encode_expense_rows, expense_select
+
+
+def orm_to_dict(app, user_id):
+    expenses = Expense.query.filter_by(user_id=user_id).order_by(Expense.date.desc()).all()
+    return app.json.dumps([expense.to_dict() for expense in expenses])
+
+
+def column_tuples(app, user_id):
+    stmt = expense_select().where(Expense.user_id == user_id).order_by(Expense.date.desc())
+    return encode_expense_rows(db.session.execute(stmt).all())
+
+
+def measure(fn, app, user_id, rows, repeat):
+    best = None
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        fn(app, user_id)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return rows / best, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--database-url", default="sqlite://")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = args.database_url
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        user_id = create_user("bench@example.com")
+        seed_expenses(user_id, args.rows)
+        for name, fn in [("orm + to_dict", orm_to_dict), ("column tuples", column_tuples)]:
+            rate, elapsed = measure(fn, app, user_id, args.rows, args.repeat)
+            print(f"{name:<15} {rate:>12,.0f} rows/sec  ({elapsed * 1000:.0f} ms for {args.rows:,} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import insert
+
+from extensions import db
+from models import Expense
+from rollups import record_expense
+
+CSV_TYPES = ("text/csv", "application/csv")
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl")
+# expenses.amount is Numeric(10, 2)
+MAX_AMOUNT = Decimal(10) ** 8
+
+
+class BulkBodyError(ValueError):
+    pass
+
+
+class TooManyRows(BulkBodyError):
+    pass
+
+
+def iter_rows(stream, mimetype):
+    """Yield (row_number, raw_row) pairs from a JSON array, NDJSON or CSV body.
+
+    NDJSON and CSV bodies are read line by line; a row that can't be decoded is
+    yielded as an exception instance so it is reported without aborting the import.
+    """
+    if mimetype in CSV_TYPES:
+        reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8", newline=""))
+        for row_number, row in enumerate(reader, start=1):
+            yield row_number, row
+    elif mimetype in NDJSON_TYPES:
+        row_number = 0
+        for line in io.TextIOWrapper(stream, encoding="utf-8"):
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                yield row_number, json.loads(line)
+            except ValueError as e:
+                yield row_number, e
+    elif mimetype == "application/json":
+        try:
+            rows = json.load(stream)
+        except ValueError as e:
+            raise BulkBodyError("Body is not valid JSON") from e
+        if not isinstance(rows, list):
+            raise BulkBodyError("JSON body must be an array of expenses")
+        yield from enumerate(rows, start=1)
+    else:
+        raise BulkBodyError("Content-Type must be application/json, application/x-ndjson or text/csv")
+
+
+def parse_row(row):
+    """Validate one raw row and return the column values for an expenses insert."""
+    if isinstance(row, Exception):
+        raise ValueError("Row is not valid JSON")
+    if not isinstance(row, dict):
+        raise ValueError("Row must be an object")
+
+    category = row.get("category")
+    raw_date = row.get("date")
+
+    if row.get("amount") in (None, "") or not category or not raw_date:
+        raise ValueError("Amount, category, and date are required")
+
+    try:
+        amount = Decimal(str(row["amount"])).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise ValueError("amount must be a number")
+    if not amount.is_finite() or not amount:
+        raise ValueError("amount must be a non-zero number")
+    if abs(amount) >= MAX_AMOUNT:
+        raise ValueError("amount must be less than 100000000 in absolute value")
+    if not isinstance(category, str) or len(category) > 50:
+        raise ValueError("category must be a string of at most 50 characters")
+    description = row.get("description")
+    if description is not None and not isinstance(description, str):
+        raise ValueError("description must be a string")
+
+    # Same parser as POST/PUT /expenses; date.fromisoformat also takes 20240101 and week dates
+    try:
+        expense_date = datetime.strptime(raw_date, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise ValueError("date must be in YYYY-MM-DD format")
+
+    return {
+        "amount": amount,
+        "category": category,
+        "description": description or "",
+        "date": expense_date,
+    }
+
+
+def ingest(user_id, rows, max_rows, chunk_size, change_seq=0):
+    """Insert valid rows in chunks within the caller's transaction.
+
+    Returns (inserted, errors) where errors lists each rejected row and why.
+    The caller commits or rolls back.
+    """
+    inserted = 0
+    errors = []
+    pending = []
+    totals = defaultdict(lambda: [Decimal(0), 0])
+
+    def flush():
+        nonlocal inserted
+        if pending:
+            db.session.execute(insert(Expense), pending)
+            inserted += len(pending)
+            pending.clear()
+
+    for row_number, row in rows:
+        if row_number > max_rows:
+            raise TooManyRows(f"A bulk import may contain at most {max_rows} rows")
+        try:
+            values = parse_row(row)
+        except ValueError as e:
+            errors.append({"row": row_number, "error": str(e)})
+            continue
+
+        values["id"] = uuid.uuid4()
+        values["user_id"] = user_id
+        values["change_seq"] = change_seq
+        pending.append(values)
+
+        total = totals[(values["date"], values["category"])]
+        total[0] += values["amount"]
+        total[1] += 1
+
+        if len(pending) >= chunk_size:
+            flush()
+    flush()
+
+    for (expense_date, category), (amount, count) in totals.items():
+        record_expense(user_id, expense_date, category, amount, count)
+
+    return inserted, errors
@@ -0,0 +1,108 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, g, request
+from sqlalchemy import select, update
+
+from auth import current_user_id
+from extensions import db
+from models import User
+
+
+def bump_expenses_version(user_id):
+    """Invalidate cached expense responses for a user and return the new version.
+
+    Runs in the caller's transaction; the returned version doubles as the
+    change sequence stamped on the rows being written.
+    """
+    return db.session.scalar(
+        update(User)
+        .where(User.id == user_id)
+        .values(expenses_version=User.expenses_version + 1)
+        .returning(User.expenses_version)
+    )
+
+
+def get_expenses_version(user_id, bind=None):
+    """Return the user's expenses_version, read from the primary unless `bind` is given.
+
+    Only the primary is guaranteed current, so ETags and change cursors are
+    always based on it; use_replica passes the replica engine to compare.
+    """
+    return db.session.scalar(
+        select(User.expenses_version).where(User.id == user_id),
+        bind_arguments={"bind": bind if bind is not None else db.engine}
+    )
+
+
+class ResponseCache:
+    """Thread-safe LRU of serialized response bodies, bounded by total size in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, body, mimetype):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[0])
+            self._entries[key] = (body, mimetype)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+def conditional_expenses(view):
+    """Serve a per-user expense read with an ETag tied to the user's expenses_version.
+
+    A matching If-None-Match gets a 304 after reading only the version, and
+    bodies are memoised in the app's ResponseCache (when enabled) under the
+    same version so any write makes old entries unreachable.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user_id = current_user_id()
+        version = g.get("expenses_version")
+        if version is None:
+            version = get_expenses_version(user_id)
+        variant = hashlib.sha1(
+            f"{request.path}?{request.query_string.decode()}|{request.headers.get('Accept', '')}".encode()
+        ).hexdigest()[:16]
+        etag = f"{version}-{variant}"
+
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+
+        cache = current_app.extensions.get("expense_cache")
+        key = (str(user_id), etag)
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            body, mimetype = cached
+            response = Response(body, mimetype=mimetype)
+        else:
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            if cache is not None:
+                cache.set(key, response.get_data(), response.mimetype)
+
+        response.set_etag(etag, weak=True)
+        return response
+    return wrapper
@@ -6,5 +6,43 @@ CREATE TABLE expenses (
     description TEXT,
     date DATE NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    change_seq BIGINT NOT NULL DEFAULT 0,
     CONSTRAINT fk_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-);
\ No newline at end of file
+);
+
+CREATE INDEX ix_expenses_user_id_date_id ON expenses (user_id, date DESC, id);
+CREATE INDEX ix_expenses_user_id_change_seq_id ON expenses (user_id, change_seq, id);
+CREATE INDEX ix_expenses_user_id_category_date ON expenses (user_id, category, date);
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX ix_expenses_description_trgm ON expenses USING gin (description gin_trgm_ops);
+
+CREATE TABLE expense_rollups (
+    user_id UUID NOT NULL,
+    period DATE NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    total DECIMAL(14,2) NOT NULL DEFAULT 0,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, period, category),
+    CONSTRAINT fk_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TABLE expense_imports (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    user_id UUID NOT NULL,
+    idempotency_key VARCHAR(255) NOT NULL,
+    result JSON NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_expense_imports_user_id_key UNIQUE (user_id, idempotency_key),
+    CONSTRAINT fk_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TABLE expense_tombstones (
+    expense_id UUID PRIMARY KEY,
+    user_id UUID NOT NULL,
+    change_seq BIGINT NOT NULL,
+    deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE INDEX ix_expense_tombstones_user_id_change_seq ON expense_tombstones (user_id, change_seq);
@@ -0,0 +1,45 @@
+import csv
+import io
+import zlib
+
+from extensions import db
+from serializers import encode_expense_row
+
+CSV_HEADER = ("id", "amount", "category", "description", "date", "created_at")
+
+
+def iter_partitions(stmt, batch_size):
+    """Yield lists of expense_select() rows from a server-side cursor."""
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    yield from result.partitions()
+
+
+def ndjson_chunks(partitions):
+    for rows in partitions:
+        yield "".join(encode_expense_row(row) + "\n" for row in rows)
+
+
+def csv_chunks(partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for rows in partitions:
+        writer.writerows(
+            (expense_id, f"{amount:.2f}", category, description,
+             expense_date.isoformat(), created_at.isoformat() if created_at else "")
+            for expense_id, _, amount, category, description, expense_date, created_at in rows
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def gzip_chunks(chunks):
+    # Sync-flush after every chunk so clients receive data as soon as it is read
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode("utf-8")) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
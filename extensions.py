@@ -1,3 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
\ No newline at end of file
+from passwords import PasswordHasher
+from routing import ReplicaRouter, RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+password_hasher = PasswordHasher()
+replica_router = ReplicaRouter()
@@ -0,0 +1,46 @@
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from models import Expense
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def apply_expense_filters(stmt, args):
+    """Narrow an expense select with the list query parameters.
+
+    Supports category, from, to (YYYY-MM-DD), min_amount, max_amount and q
+    (case-insensitive substring of the description). Raises ValueError with
+    a client-facing message on malformed values.
+    """
+    category = args.get("category")
+    if category:
+        stmt = stmt.where(Expense.category == category)
+
+    for name, compare in (("from", Expense.date.__ge__), ("to", Expense.date.__le__)):
+        value = args.get(name)
+        if value:
+            try:
+                stmt = stmt.where(compare(datetime.strptime(value, "%Y-%m-%d").date()))
+            except ValueError:
+                raise ValueError(f"{name} must be a date in YYYY-MM-DD format")
+
+    for name, compare in (("min_amount", Expense.amount.__ge__), ("max_amount", Expense.amount.__le__)):
+        value = args.get(name)
+        if value:
+            try:
+                amount = Decimal(value)
+            except InvalidOperation:
+                raise ValueError(f"{name} must be a number")
+            if not amount.is_finite():
+                raise ValueError(f"{name} must be a number")
+            stmt = stmt.where(compare(amount))
+
+    # Served by the pg_trgm index on Postgres; a scan of the user's rows elsewhere
+    q = args.get("q")
+    if q:
+        stmt = stmt.where(Expense.description.ilike(f"%{_escape_like(q)}%", escape="\\"))
+
+    return stmt
@@ -0,0 +1,144 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from decimal import Decimal
+
+from expense_cache import bump_expenses_version
+from extensions import db
+from models import Expense
+from rollups import record_expense
+
+logger = logging.getLogger(__name__)
+
+CENTS = Decimal("0.01")
+
+
+class GroupCommitTimeout(Exception):
+    """The row was withdrawn from the queue before it was committed, so a retry is safe."""
+
+
+class GroupCommitter:
+    """Queue single-expense inserts and commit them together.
+
+    Request threads call `submit`, which blocks until the shared transaction
+    holding their row has committed (or failed). A background thread drains
+    the queue every `window_ms` milliseconds or once `max_batch` rows are
+    waiting, whichever comes first. Only threads within one worker process
+    share a batch, so this pays off with threaded workers (e.g. gthread).
+    """
+
+    def __init__(self, app, window_ms=5, max_batch=100, timeout=30):
+        self.app = app
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.stats = {
+            "batches": 0,
+            "rows": 0,
+            "failed_batches": 0,
+            "max_batch_size": 0,
+            "queue_wait_seconds": 0.0,
+        }
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def submit(self, values):
+        """Queue one expense row and return its dict once committed.
+
+        Raises GroupCommitTimeout if the row is still queued after `timeout`
+        seconds. A row whose batch has already started is waited for instead,
+        so the caller never gets an error for a row that later commits.
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((values, future, time.monotonic()))
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            if future.cancel():
+                raise GroupCommitTimeout(f"Expense was not committed within {self.timeout}s")
+            return future.result()
+
+    def _ensure_worker(self):
+        # Threads don't survive fork, so start one lazily in each worker process
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, name="group-commit", daemon=True).start()
+                self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                deadline = time.monotonic() + self.window
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+
+                # Skip rows whose request gave up; the rest can no longer be cancelled
+                batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+                if not batch:
+                    continue
+
+                started = time.monotonic()
+                self.stats["batches"] += 1
+                self.stats["rows"] += len(batch)
+                self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(batch))
+                self.stats["queue_wait_seconds"] += sum(started - queued_at for _, _, queued_at in batch)
+
+                with self.app.app_context():
+                    self._flush(batch)
+            except Exception as e:
+                # Keep the thread alive; a dead committer would hang every later POST
+                logger.exception("Group commit batch failed")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _flush(self, batch):
+        try:
+            results = self._commit([values for values, _, _ in batch])
+        except Exception:
+            db.session.rollback()
+            self.stats["failed_batches"] += 1
+            # Retry row by row so only the offending requests see an error
+            for values, future, _ in batch:
+                try:
+                    future.set_result(self._commit([values])[0])
+                except Exception as e:
+                    db.session.rollback()
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def _commit(self, rows):
+        # One version bump per user, in a fixed order so concurrent batches lock users alike
+        user_ids = sorted({values["user_id"] for values in rows}, key=str)
+        change_seqs = {user_id: bump_expenses_version(user_id) for user_id in user_ids}
+        expenses = [
+            # Rounded like the column so to_dict() before reload matches every other response
+            Expense(**{**values, "amount": Decimal(str(values["amount"])).quantize(CENTS)},
+                    change_seq=change_seqs[values["user_id"]])
+            for values in rows
+        ]
+        db.session.add_all(expenses)
+        for expense in expenses:
+            record_expense(expense.user_id, expense.date, expense.category, expense.amount)
+        db.session.flush()
+        results = [expense.to_dict() for expense in expenses]
+        db.session.commit()
+        return results
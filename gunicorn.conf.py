@@ -0,0 +1,81 @@
+# Production gunicorn settings, picked up automatically from the working directory:
+#
+#   gunicorn "app:create_app()"
+#
+# The app is imported and built once in the master (preload_app), then
+# forked. Each worker drops the pooled connections it inherited and opens
+# DB_POOL_WARM connections before taking traffic, so the first requests
+# don't pay for connection setup.
+import logging
+import os
+import time
+
+from sqlalchemy import text
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', 5001)}")
+workers = int(os.getenv("WEB_CONCURRENCY", 2 * (os.cpu_count() or 1) + 1))
+# gthread lets EXPENSES_GROUP_COMMIT batch concurrent writes within a worker
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+preload_app = True
+
+# Recycle workers to bound memory growth; jitter keeps them from restarting together
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 400))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+
+pool_warm = int(os.getenv("DB_POOL_WARM", 2))
+
+logger = logging.getLogger("gunicorn.error")
+# Gunicorn reads this file before preloading the app, so this covers app import and create_app()
+_started = {"master": time.perf_counter()}
+
+
+def when_ready(server):
+    logger.info("Startup: app loaded and master ready in %.0f ms", (time.perf_counter() - _started["master"]) * 1000)
+
+
+def post_fork(server, worker):
+    _started["worker"] = time.perf_counter()
+
+    from extensions import db
+
+    # Pooled connections must not be shared across processes; drop the
+    # master's references without closing the sockets it may still use
+    app = worker.app.wsgi()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    from extensions import db
+
+    warm_started = time.perf_counter()
+    app = worker.app.wsgi()
+    with app.app_context():
+        engine = db.engines[None]
+        connections = []
+        try:
+            for _ in range(pool_warm):
+                connection = engine.connect()
+                connection.execute(text("SELECT 1"))
+                connections.append(connection)
+        except Exception as e:
+            logger.warning("Worker %s could not pre-warm database connections: %s", worker.pid, e)
+        finally:
+            for connection in connections:
+                connection.close()
+
+    logger.info(
+        "Startup: worker %s ready in %.0f ms (%d connections warmed in %.0f ms)",
+        worker.pid,
+        (time.perf_counter() - _started["worker"]) * 1000,
+        len(connections),
+        (time.perf_counter() - warm_started) * 1000,
+    )
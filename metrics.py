@@ -0,0 +1,173 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 500)
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            route = _current_route() if has_request_context() else "-"
+            metrics.observe("db_pool_wait_seconds", time.perf_counter() - started, SECONDS_BUCKETS, route=route)
+
+
+def _label_string(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Metrics:
+    """In-process counters, gauges and histograms rendered in Prometheus text format.
+
+    Each gunicorn worker keeps its own numbers, so scrape every worker or
+    aggregate by instance.
+    """
+
+    def __init__(self, app=None):
+        self.slow_query_seconds = None
+        self._counters = defaultdict(float)
+        self._gauges = defaultdict(float)
+        self._histograms = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_QUERY_MS', None)
+        if app.config['SLOW_QUERY_MS'] is not None:
+            self.slow_query_seconds = app.config['SLOW_QUERY_MS'] / 1000
+        _register_engine_events()
+
+        app.before_request(_start_request)
+        app.after_request(self._track_response)
+        app.add_url_rule("/metrics", "metrics", self.render_response)
+        app.extensions['metrics'] = self
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += value
+
+    def add(self, name, delta, **labels):
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] += delta
+
+    def observe(self, name, value, buckets, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [buckets, [0] * len(buckets), 0, 0.0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[1][i] += 1
+            histogram[2] += 1
+            histogram[3] += value
+
+    def add_collector(self, name, stats):
+        """Export a component's `stats` dict (e.g. GroupCommitter.stats) on every scrape."""
+        self._collectors[name] = stats
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                lines.append(f"{name}{_label_string(labels)} {value}")
+            for (name, labels), value in sorted(self._gauges.items()):
+                lines.append(f"{name}{_label_string(labels)} {value}")
+            for (name, labels), (buckets, counts, count, total) in sorted(self._histograms.items()):
+                for bound, bucket_count in zip(buckets, counts):
+                    lines.append(f"{name}_bucket{_label_string(labels + (('le', bound),))} {bucket_count}")
+                lines.append(f"{name}_bucket{_label_string(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_count{_label_string(labels)} {count}")
+                lines.append(f"{name}_sum{_label_string(labels)} {total}")
+        for prefix, stats in self._collectors.items():
+            for key, value in stats.items():
+                lines.append(f"{prefix}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+    def render_response(self):
+        return Response(self.render(), mimetype="text/plain; version=0.0.4")
+
+    def _track_response(self, response):
+        # Record on close rather than teardown: teardown also runs before a
+        # stream_with_context body is sent, and again once it has finished
+        if "sql_queries" in g:
+            route = _current_route()
+            counters = g._get_current_object()
+            response.call_on_close(lambda: self._finish_request(route, counters))
+        return response
+
+    def _finish_request(self, route, counters):
+        self.inc("http_requests_total", route=route)
+        self.inc("db_queries_total", counters.sql_queries, route=route)
+        self.inc("db_query_seconds_total", counters.sql_seconds, route=route)
+        self.observe("db_queries_per_request", counters.sql_queries, QUERY_COUNT_BUCKETS, route=route)
+
+
+metrics = Metrics()
+
+
+def _current_route():
+    if request.url_rule is None:
+        return "unmatched"
+    return f"{request.method} {request.url_rule.rule}"
+
+
+def _start_request():
+    g.sql_queries = 0
+    g.sql_seconds = 0.0
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    if has_request_context() and "sql_queries" in g:
+        g.sql_queries += 1
+        g.sql_seconds += elapsed
+    if metrics.slow_query_seconds is not None and elapsed >= metrics.slow_query_seconds:
+        route = _current_route() if has_request_context() else "-"
+        logger.warning("Slow query (%.1f ms) on %s: %s", elapsed * 1000, route, statement)
+
+
+def _checkout(dbapi_connection, connection_record, connection_proxy):
+    metrics.inc("db_pool_checkouts_total")
+    metrics.add("db_pool_checked_out", 1)
+
+
+def _checkin(dbapi_connection, connection_record):
+    metrics.add("db_pool_checked_out", -1)
+
+
+_registered = False
+
+
+def _register_engine_events():
+    # Listen on the classes so every engine (including later binds) is covered
+    global _registered
+    if _registered:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Pool, "checkout", _checkout)
+    event.listen(Pool, "checkin", _checkin)
+    _registered = True
@@ -1,11 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
 from flask_jwt_extended import create_access_token
 from datetime import datetime
 import uuid
-from extensions import db
-
-bcrypt = Bcrypt()
+from extensions import db, password_hasher
 
 class User(db.Model):
     __tablename__ = "users"
@@ -15,12 +12,17 @@ class User(db.Model):
     email = db.Column(db.String(255), unique=True, nullable=False)
     password_hash = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped by every expense write; drives ETags and response caching
+    expenses_version = db.Column(db.BigInteger, nullable=False, default=0, server_default="0")
 
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode("utf-8")
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return password_hasher.check(self.password_hash, password)
+
+    def needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
     
 
 class Expense(db.Model):
@@ -33,6 +35,8 @@ class Expense(db.Model):
     description = db.Column(db.Text, nullable=True)
     date = db.Column(db.Date, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # users.expenses_version at the time of the last insert or update
+    change_seq = db.Column(db.BigInteger, nullable=False, default=0, server_default="0")
 
     user = db.relationship("User", backref=db.backref("expenses", lazy=True, cascade="all, delete"))
 
@@ -46,3 +50,62 @@ class Expense(db.Model):
             "date": self.date,
             "created_at": self.created_at
         }
+
+
+class ExpenseRollup(db.Model):
+    __tablename__ = "expense_rollups"
+
+    user_id = db.Column(db.UUID(as_uuid=True), db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    period = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(50), primary_key=True)
+    total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ExpenseImport(db.Model):
+    __tablename__ = "expense_imports"
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "idempotency_key", name="uq_expense_imports_user_id_key"),
+    )
+
+    id = db.Column(db.UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = db.Column(db.UUID(as_uuid=True), db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    idempotency_key = db.Column(db.String(255), nullable=False)
+    result = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class ExpenseTombstone(db.Model):
+    __tablename__ = "expense_tombstones"
+    __table_args__ = (
+        db.Index("ix_expense_tombstones_user_id_change_seq", "user_id", "change_seq"),
+    )
+
+    expense_id = db.Column(db.UUID(as_uuid=True), primary_key=True)
+    user_id = db.Column(db.UUID(as_uuid=True), db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    change_seq = db.Column(db.BigInteger, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# Keyset pagination on (date, id) for a single user walks this index in order
+db.Index("ix_expenses_user_id_date_id", Expense.user_id, Expense.date.desc(), Expense.id)
+
+# Delta sync pages through a user's rows changed after a given (change_seq, id)
+db.Index("ix_expenses_user_id_change_seq_id", Expense.user_id, Expense.change_seq, Expense.id)
+
+# Category and date-range filters on the expense list
+db.Index("ix_expenses_user_id_category_date", Expense.user_id, Expense.category, Expense.date)
+
+# Description search (ILIKE '%q%') uses a trigram index on Postgres; declared
+# here as well as in the migration so create_all() schemas match
+db.event.listen(
+    Expense.__table__,
+    "before_create",
+    db.DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+db.Index(
+    "ix_expenses_description_trgm",
+    Expense.description,
+    postgresql_using="gin",
+    postgresql_ops={"description": "gin_trgm_ops"}
+).ddl_if(dialect="postgresql")
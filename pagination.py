@@ -0,0 +1,125 @@
+import base64
+import uuid
+from datetime import date
+
+from sqlalchemy import and_, or_, select
+
+from extensions import db
+from models import Expense, ExpenseTombstone
+from serializers import EXPENSE_COLUMNS
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(expense_date, expense_id):
+    raw = f"{expense_date.isoformat()}|{expense_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        expense_date, expense_id = raw.split("|")
+        return date.fromisoformat(expense_date), uuid.UUID(expense_id)
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def keyset_order(stmt):
+    # Matches the (user_id, date DESC, id) index on expenses
+    return stmt.order_by(Expense.date.desc(), Expense.id.asc())
+
+
+def after_cursor(stmt, cursor):
+    """Restrict an ordered expense select to rows that come after `cursor`."""
+    expense_date, expense_id = decode_cursor(cursor)
+    return stmt.where(or_(
+        Expense.date < expense_date,
+        and_(Expense.date == expense_date, Expense.id > expense_id),
+    ))
+
+
+def keyset_page(stmt, limit, cursor=None):
+    """Return one page of expense rows and the cursor for the next page (or None)."""
+    stmt = keyset_order(stmt)
+    if cursor:
+        stmt = after_cursor(stmt, cursor)
+
+    rows = db.session.execute(stmt.limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.date, last.id)
+    return rows, next_cursor
+
+
+def encode_change_cursor(change_seq, row_id=None):
+    """Cursor for /expenses/changes: a bare version once caught up, else the last row sent."""
+    if row_id is None:
+        return str(change_seq)
+    raw = f"{change_seq}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_change_cursor(cursor):
+    if cursor.isdigit():
+        return int(cursor), None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        change_seq, row_id = raw.split("|")
+        return int(change_seq), uuid.UUID(row_id)
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def _after_change(stmt, seq_column, id_column, change_seq, row_id):
+    if row_id is None:
+        return stmt.where(seq_column > change_seq)
+    return stmt.where(or_(
+        seq_column > change_seq,
+        and_(seq_column == change_seq, id_column > row_id),
+    ))
+
+
+def changes_page(user_id, version, limit, cursor=None):
+    """Return one page of changes up to `version`, oldest first.
+
+    Returns (rows, deleted_ids, next_cursor, has_more) where rows are
+    expense_select() tuples. Changed rows and tombstones are merged on
+    (change_seq, id) so a page never splits a write's rows between two
+    cursors. Without a cursor tombstones are skipped, as an initial sync
+    has nothing to delete.
+    """
+    changed = (
+        select(Expense.change_seq, *EXPENSE_COLUMNS)
+        .where(Expense.user_id == user_id, Expense.change_seq <= version)
+        .order_by(Expense.change_seq, Expense.id)
+        .limit(limit + 1)
+    )
+    deleted = (
+        select(ExpenseTombstone.change_seq, ExpenseTombstone.expense_id)
+        .where(ExpenseTombstone.user_id == user_id, ExpenseTombstone.change_seq <= version)
+        .order_by(ExpenseTombstone.change_seq, ExpenseTombstone.expense_id)
+        .limit(limit + 1)
+    )
+
+    entries = []
+    if cursor:
+        change_seq, row_id = decode_change_cursor(cursor)
+        changed = _after_change(changed, Expense.change_seq, Expense.id, change_seq, row_id)
+        deleted = _after_change(deleted, ExpenseTombstone.change_seq, ExpenseTombstone.expense_id, change_seq, row_id)
+        entries.extend((seq, expense_id, None) for seq, expense_id in db.session.execute(deleted))
+    entries.extend((row[0], row[1], tuple(row[1:])) for row in db.session.execute(changed))
+    entries.sort(key=lambda entry: (entry[0], entry[1]))
+
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    next_cursor = encode_change_cursor(*entries[-1][:2]) if has_more else encode_change_cursor(version)
+    rows = [row for _, _, row in entries if row is not None]
+    deleted_ids = [expense_id for _, expense_id, row in entries if row is None]
+    return rows, deleted_ids, next_cursor, has_more
@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask_bcrypt import Bcrypt
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """Run bcrypt on a small, bounded thread pool instead of the request thread.
+
+    bcrypt releases the GIL, so hashes run in parallel with other requests.
+    At most `max_workers + max_queue` calls may be in flight; beyond that
+    callers get PasswordHasherBusy straight away rather than queueing.
+    """
+
+    def __init__(self, app=None):
+        self.bcrypt = Bcrypt()
+        self.log_rounds = 12
+        self.max_workers = 4
+        self.max_queue = 16
+        self.stats = {
+            "in_flight": 0,
+            "hashes": 0,
+            "checks": 0,
+            "rehashes": 0,
+            "rejected": 0,
+            "seconds": 0.0,
+        }
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('BCRYPT_LOG_ROUNDS', 12)
+        app.config.setdefault('BCRYPT_MAX_WORKERS', 4)
+        app.config.setdefault('BCRYPT_MAX_QUEUE', 16)
+        self.bcrypt.init_app(app)
+        self.log_rounds = app.config['BCRYPT_LOG_ROUNDS']
+        self.max_workers = app.config['BCRYPT_MAX_WORKERS']
+        self.max_queue = app.config['BCRYPT_MAX_QUEUE']
+        app.extensions['password_hasher'] = self
+
+    def hash(self, password):
+        password_hash = self._run(self.bcrypt.generate_password_hash, password)
+        self.stats["hashes"] += 1
+        return password_hash.decode("utf-8")
+
+    def check(self, password_hash, password):
+        matches = self._run(self.bcrypt.check_password_hash, password_hash, password)
+        self.stats["checks"] += 1
+        return matches
+
+    def needs_rehash(self, password_hash):
+        # bcrypt hashes look like $2b$<cost>$<salt+hash>
+        try:
+            return int(password_hash.split("$")[2]) != self.log_rounds
+        except (IndexError, ValueError):
+            return True
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self.stats["in_flight"] >= self.max_workers + self.max_queue:
+                self.stats["rejected"] += 1
+                raise PasswordHasherBusy("Too many password operations in progress")
+            self.stats["in_flight"] += 1
+            # Worker threads don't survive fork, so each process builds its own pool
+            if self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="bcrypt")
+                self._pid = os.getpid()
+            executor = self._executor
+
+        started = time.perf_counter()
+        try:
+            return executor.submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self.stats["in_flight"] -= 1
+                self.stats["seconds"] += time.perf_counter() - started
@@ -0,0 +1,114 @@
+from decimal import Decimal
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete, extract, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from extensions import db
+from models import Expense, ExpenseRollup
+
+GROUP_BY_CHOICES = ("category", "month", "day")
+
+_UPSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def record_expense(user_id, day, category, amount, count=1):
+    """Add `amount` to the user's daily rollup inside the current transaction.
+
+    Pass a negative amount and count to back an expense out again.
+    """
+    amount = Decimal(str(amount))
+    dialect_insert = _UPSERT_DIALECTS.get(db.session.get_bind().dialect.name)
+
+    if dialect_insert is not None:
+        stmt = dialect_insert(ExpenseRollup).values(
+            user_id=user_id, period=day, category=category, total=amount, count=count
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ExpenseRollup.user_id, ExpenseRollup.period, ExpenseRollup.category],
+            set_={
+                "total": ExpenseRollup.total + stmt.excluded.total,
+                "count": ExpenseRollup.count + stmt.excluded.count,
+            },
+        )
+        db.session.execute(stmt)
+        return
+
+    rollup = db.session.get(ExpenseRollup, (user_id, day, category))
+    if rollup is None:
+        db.session.add(ExpenseRollup(user_id=user_id, period=day, category=category, total=amount, count=count))
+    else:
+        rollup.total += amount
+        rollup.count += count
+
+
+def summarize(user_id, group_by, date_from=None, date_to=None):
+    """Aggregate a user's rollups by category, month or day."""
+    if group_by == "category":
+        keys = [ExpenseRollup.category]
+    elif group_by == "month":
+        keys = [extract("year", ExpenseRollup.period), extract("month", ExpenseRollup.period)]
+    elif group_by == "day":
+        keys = [ExpenseRollup.period]
+    else:
+        raise ValueError(f"group_by must be one of: {', '.join(GROUP_BY_CHOICES)}")
+
+    stmt = (
+        select(*keys, func.sum(ExpenseRollup.total), func.sum(ExpenseRollup.count))
+        .where(ExpenseRollup.user_id == user_id)
+        .group_by(*keys)
+        .having(func.sum(ExpenseRollup.count) > 0)
+        .order_by(*keys)
+    )
+    if date_from:
+        stmt = stmt.where(ExpenseRollup.period >= date_from)
+    if date_to:
+        stmt = stmt.where(ExpenseRollup.period <= date_to)
+
+    summary = []
+    for row in db.session.execute(stmt):
+        *key, total, count = row
+        if group_by == "category":
+            entry = {"category": key[0]}
+        elif group_by == "month":
+            entry = {"period": f"{int(key[0]):04d}-{int(key[1]):02d}"}
+        else:
+            entry = {"period": key[0].isoformat()}
+        entry["total"] = Decimal(total).quantize(Decimal("0.01"))
+        entry["count"] = int(count)
+        summary.append(entry)
+    return summary
+
+
+def backfill_rollups():
+    """Rebuild expense_rollups from the expenses table. Returns the number of rollup rows."""
+    totals = (
+        select(
+            Expense.user_id,
+            Expense.date,
+            Expense.category,
+            func.sum(Expense.amount),
+            func.count(Expense.id),
+        )
+        .group_by(Expense.user_id, Expense.date, Expense.category)
+    )
+    db.session.execute(delete(ExpenseRollup))
+    db.session.execute(
+        insert(ExpenseRollup).from_select(
+            ["user_id", "period", "category", "total", "count"], totals
+        )
+    )
+    db.session.commit()
+    return db.session.scalar(select(func.count()).select_from(ExpenseRollup))
+
+
+@click.command("backfill-rollups")
+@with_appcontext
+def backfill_rollups_command():
+    """Rebuild the expense_rollups table from existing expenses."""
+    rows = backfill_rollups()
+    click.echo(f"Backfilled {rows} rollup rows")
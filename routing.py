@@ -0,0 +1,136 @@
+import logging
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.exc import OperationalError
+
+from auth import current_user_id
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = "replica"
+
+POSTGRES_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica bind inside @use_replica views.
+
+    ORM flushes and Core insert/update/delete statements (such as
+    bump_expenses_version and record_expense) always go to the primary.
+    Writes in text() SQL can't be told apart from reads and would be sent
+    to the replica, so don't run them in a read route.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        is_write = self._flushing or isinstance(clause, UpdateBase)
+        if bind is None and not is_write and has_app_context() and g.get("use_replica"):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """Decides per request whether reads may go to the replica.
+
+    Reads stay on the primary while the replica has not yet replayed the
+    user's latest write, while the replica is marked down after a connection
+    error, or while its replication lag exceeds REPLICA_MAX_LAG_SECONDS.
+    """
+
+    def __init__(self, app=None):
+        self.retry_seconds = 30
+        self.max_lag_seconds = None
+        self.lag_check_seconds = 5
+        self._down_until = 0
+        self._lag = (0, 0.0)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('REPLICA_RETRY_SECONDS', 30)
+        app.config.setdefault('REPLICA_MAX_LAG_SECONDS', None)
+        app.config.setdefault('REPLICA_LAG_CHECK_SECONDS', 5)
+        self.retry_seconds = app.config['REPLICA_RETRY_SECONDS']
+        self.max_lag_seconds = app.config['REPLICA_MAX_LAG_SECONDS']
+        self.lag_check_seconds = app.config['REPLICA_LAG_CHECK_SECONDS']
+        app.extensions['replica_router'] = self
+
+    def mark_down(self):
+        self._down_until = time.monotonic() + self.retry_seconds
+
+    def replica_usable(self, engine):
+        if time.monotonic() < self._down_until:
+            return False
+        if self.max_lag_seconds is None:
+            return True
+        return self._replication_lag(engine) <= self.max_lag_seconds
+
+    def _replication_lag(self, engine):
+        checked_at, lag = self._lag
+        if time.monotonic() - checked_at < self.lag_check_seconds:
+            return lag
+        lag = 0.0
+        if engine.dialect.name == "postgresql":
+            with engine.connect() as connection:
+                lag = float(connection.scalar(POSTGRES_LAG_SQL) or 0)
+        self._lag = (time.monotonic(), lag)
+        return lag
+
+
+def use_replica(view):
+    """Serve a read-only view from the replica when it is safe to do so.
+
+    Every write bumps the user's expenses_version on the primary in the same
+    transaction, so a replica holding that version has all of the user's
+    writes; otherwise the view reads from the primary. Reading the replica's
+    version also opens its connection before the view runs, which matters
+    for streamed views that only query once the response is being sent. If
+    the replica can't be reached the view is re-run against the primary.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # Imported here because extensions imports this module
+        from expense_cache import get_expenses_version
+
+        router = current_app.extensions.get("replica_router")
+        replica = current_app.extensions["sqlalchemy"].engines.get(REPLICA_BIND)
+        if router is None or replica is None:
+            return view(*args, **kwargs)
+
+        user_id = current_user_id()
+        g.expenses_version = get_expenses_version(user_id)
+        session = current_app.extensions["sqlalchemy"].session
+        try:
+            if router.replica_usable(replica):
+                replica_version = get_expenses_version(user_id, bind=replica)
+                if replica_version is not None and replica_version >= g.expenses_version:
+                    g.use_replica = True
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if response.is_streamed:
+                        response.response = _mark_down_on_error(router, response.response)
+                    return response
+        except OperationalError as e:
+            logger.warning("Replica unavailable, reading from primary: %s", e)
+            router.mark_down()
+            session.rollback()
+        g.use_replica = False
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _mark_down_on_error(router, chunks):
+    # Too late to fall back once the body has started; spare the next requests instead
+    try:
+        yield from chunks
+    except OperationalError:
+        router.mark_down()
+        raise
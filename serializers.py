@@ -0,0 +1,59 @@
+import decimal
+import uuid
+from datetime import date
+from json.encoder import encode_basestring_ascii as encode_string
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import select
+
+from models import Expense
+
+# Column order shared by expense_select() and encode_expense_row()
+EXPENSE_COLUMNS = (
+    Expense.id,
+    Expense.user_id,
+    Expense.amount,
+    Expense.category,
+    Expense.description,
+    Expense.date,
+    Expense.created_at,
+)
+
+
+def expense_select():
+    """Select an expense as a plain tuple, skipping ORM instance hydration."""
+    return select(*EXPENSE_COLUMNS)
+
+
+def encode_expense_row(row):
+    """Encode one expense_select() row as a JSON object, same keys as Expense.to_dict."""
+    expense_id, user_id, amount, category, description, expense_date, created_at = row
+    description = "null" if description is None else encode_string(description)
+    created_at = "null" if created_at is None else f'"{created_at.isoformat()}"'
+    return (
+        f'{{"id":"{expense_id}","user_id":"{user_id}","amount":"{amount:.2f}",'
+        f'"category":{encode_string(category)},"description":{description},'
+        f'"date":"{expense_date.isoformat()}","created_at":{created_at}}}'
+    )
+
+
+def encode_expense_rows(rows):
+    return "[" + ",".join(map(encode_expense_row, rows)) + "]"
+
+
+class ExpenseJSONProvider(DefaultJSONProvider):
+    """JSON provider that writes dates as ISO 8601 and amounts with two decimals.
+
+    Installed on the app so ORM-backed responses such as Expense.to_dict()
+    match the fast serializer above.
+    """
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, date):
+            return o.isoformat()
+        if isinstance(o, decimal.Decimal):
+            return f"{o:.2f}"
+        if isinstance(o, uuid.UUID):
+            return str(o)
+        return DefaultJSONProvider.default(o)
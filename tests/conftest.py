@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extensions import db
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Build an app on a fresh SQLite file; keyword arguments are extra environment variables."""
+    apps = []
+
+    def make_app(**env):
+        monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'primary.db'}")
+        monkeypatch.setenv("JWT_SECRET_KEY", "test-secret-key-long-enough-for-hs256")
+        monkeypatch.setenv("BCRYPT_LOG_ROUNDS", "4")
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+
+        from app import create_app
+
+        app = create_app()
+        app.config["TESTING"] = True
+        with app.app_context():
+            db.create_all(bind_key=None)
+        apps.append(app)
+        return app
+
+    yield make_app
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(client):
+    response = client.post("/register", json={"name": "Test", "email": "test@example.com", "password": "secret"})
+    return {"Authorization": f"Bearer {response.json['token']}"}
@@ -0,0 +1,37 @@
+import pytest
+
+from bulk import parse_row
+
+
+def test_parse_row_rejects_non_string_description():
+    with pytest.raises(ValueError, match="description"):
+        parse_row({"amount": "1", "category": "food", "date": "2024-01-01", "description": {"x": 1}})
+
+
+@pytest.mark.parametrize("amount", ["1e12", "100000000", "-100000000"])
+def test_parse_row_rejects_amounts_outside_the_column(amount):
+    with pytest.raises(ValueError, match="amount"):
+        parse_row({"amount": amount, "category": "food", "date": "2024-01-01"})
+
+
+def test_bad_rows_are_reported_without_failing_the_import(client, auth_headers):
+    rows = [
+        {"amount": "12.50", "category": "food", "date": "2024-01-01", "description": "lunch"},
+        {"amount": "3", "category": "food", "date": "2024-01-02", "description": {"x": 1}},
+        {"amount": "1e12", "category": "food", "date": "2024-01-03"},
+        {"amount": "99999999.99", "category": "rent", "date": "2024-01-04", "description": None},
+    ]
+    response = client.post("/expenses/bulk", json=rows, headers=auth_headers)
+
+    assert response.status_code == 201
+    assert response.json["inserted"] == 2
+    assert [error["row"] for error in response.json["errors"]] == [2, 3]
+
+    summary = client.get("/expenses/summary", headers=auth_headers).json["summary"]
+    assert sorted(group["total"] for group in summary) == ["12.50", "99999999.99"]
+
+
+@pytest.mark.parametrize("raw_date", ["20240101", "2024-W01-1", 20240101])
+def test_parse_row_only_accepts_yyyy_mm_dd(raw_date):
+    with pytest.raises(ValueError, match="YYYY-MM-DD"):
+        parse_row({"amount": "1", "category": "food", "date": raw_date})
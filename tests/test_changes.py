@@ -0,0 +1,54 @@
+def sync(client, headers, since=None, limit=2):
+    changed, deleted = [], []
+    while True:
+        params = {"limit": limit}
+        if since is not None:
+            params["since"] = since
+        page = client.get("/expenses/changes", query_string=params, headers=headers).json
+        changed += [expense["id"] for expense in page["changed"]]
+        deleted += page["deleted"]
+        since = page["cursor"]
+        if not page["has_more"]:
+            return changed, deleted, since
+
+
+def add_expense(client, headers, category="food"):
+    response = client.post(
+        "/expenses", json={"amount": 5, "category": category, "date": "2024-01-01"}, headers=headers
+    )
+    return response.json["expense"]["id"]
+
+
+def test_pages_split_a_bulk_import_without_losing_rows(client, auth_headers):
+    rows = [{"amount": "1", "category": "food", "date": "2024-01-01"} for _ in range(5)]
+    client.post("/expenses/bulk", json=rows, headers=auth_headers)
+    single = add_expense(client, auth_headers)
+
+    changed, deleted, cursor = sync(client, auth_headers)
+
+    assert len(changed) == len(set(changed)) == 6
+    assert changed[-1] == single
+    assert deleted == []
+    assert cursor.isdigit()
+
+
+def test_later_pages_report_updates_and_deletes(client, auth_headers):
+    kept = add_expense(client, auth_headers)
+    removed = add_expense(client, auth_headers)
+    _, _, cursor = sync(client, auth_headers)
+
+    client.put(
+        f"/expenses/{kept}", json={"amount": 7, "category": "rent", "date": "2024-01-02"}, headers=auth_headers
+    )
+    client.delete(f"/expenses/{removed}", headers=auth_headers)
+    added = add_expense(client, auth_headers)
+
+    changed, deleted, cursor = sync(client, auth_headers, since=cursor, limit=1)
+    assert changed == [kept, added]
+    assert deleted == [removed]
+    assert sync(client, auth_headers, since=cursor)[:2] == ([], [])
+
+
+def test_rejects_malformed_cursor_and_limit(client, auth_headers):
+    assert client.get("/expenses/changes?since=nope", headers=auth_headers).status_code == 400
+    assert client.get("/expenses/changes?limit=0", headers=auth_headers).status_code == 400
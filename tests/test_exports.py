@@ -0,0 +1,26 @@
+import gzip
+
+import pytest
+
+
+@pytest.fixture
+def expense(client, auth_headers):
+    client.post("/expenses", json={"amount": 5, "category": "food", "date": "2024-01-01"}, headers=auth_headers)
+
+
+@pytest.mark.parametrize("accept_encoding, compressed", [
+    ("gzip", True),
+    ("gzip;q=0.5, identity", True),
+    ("gzip;q=0", False),
+    ("identity", False),
+])
+def test_export_honours_accept_encoding(client, auth_headers, expense, accept_encoding, compressed):
+    response = client.get(
+        "/expenses/export?format=csv", headers={**auth_headers, "Accept-Encoding": accept_encoding}
+    )
+    body = response.get_data()
+
+    assert (response.headers.get("Content-Encoding") == "gzip") is compressed
+    text = (gzip.decompress(body) if compressed else body).decode()
+    assert text.splitlines()[0].startswith("id,amount")
+    assert "food" in text
@@ -0,0 +1,124 @@
+import threading
+import uuid
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from extensions import db
+from group_commit import GroupCommitTimeout, GroupCommitter
+from models import Expense, User
+
+
+@pytest.fixture
+def user_id(app, auth_headers):
+    with app.app_context():
+        return db.session.scalar(db.select(User.id))
+
+
+def expense_values(user_id, category="food"):
+    return {
+        "id": uuid.uuid4(),
+        "user_id": user_id,
+        "amount": 10,
+        "category": category,
+        "description": "",
+        "date": date(2024, 1, 1),
+    }
+
+
+def submit_concurrently(committer, rows):
+    results = [None] * len(rows)
+
+    def submit(i):
+        try:
+            results[i] = committer.submit(rows[i])
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(rows))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def stored_ids(app):
+    with app.app_context():
+        return set(db.session.scalars(db.select(Expense.id)))
+
+
+def test_failed_batch_is_retried_row_by_row(app, user_id):
+    committer = GroupCommitter(app, window_ms=200, max_batch=10)
+    rows = [expense_values(user_id), expense_values(user_id, category=None), expense_values(user_id)]
+
+    results = submit_concurrently(committer, rows)
+
+    assert committer.stats["batches"] == 1
+    assert committer.stats["failed_batches"] == 1
+    assert isinstance(results[1], Exception)
+    assert [results[0]["id"], results[2]["id"]] == [str(rows[0]["id"]), str(rows[2]["id"])]
+    assert stored_ids(app) == {rows[0]["id"], rows[2]["id"]}
+
+
+def test_timed_out_row_is_never_committed(app, user_id):
+    committer = GroupCommitter(app, window_ms=300, max_batch=10, timeout=0.05)
+    row = expense_values(user_id)
+
+    with pytest.raises(GroupCommitTimeout):
+        committer.submit(row)
+
+    # The next batch only starts once the withdrawn row has been skipped
+    committer.timeout = 5
+    later = expense_values(user_id)
+    committer.submit(later)
+    assert stored_ids(app) == {later["id"]}
+
+
+def test_worker_survives_unexpected_errors(app, user_id, monkeypatch):
+    committer = GroupCommitter(app, window_ms=1, timeout=5)
+    monkeypatch.setattr(committer, "_flush", lambda batch: 1 / 0)
+
+    with pytest.raises(ZeroDivisionError):
+        committer.submit(expense_values(user_id))
+
+    monkeypatch.undo()
+    row = expense_values(user_id)
+    assert committer.submit(row)["id"] == str(row["id"])
+
+
+def test_batch_bumps_each_users_version_once(app, user_id):
+    committer = GroupCommitter(app, window_ms=200, max_batch=10)
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        results = submit_concurrently(committer, [expense_values(user_id) for _ in range(3)])
+    finally:
+        with app.app_context():
+            event.remove(db.engine, "before_cursor_execute", record)
+
+    assert committer.stats["batches"] == 1
+    assert all(isinstance(result, dict) for result in results)
+    with app.app_context():
+        assert len(set(db.session.scalars(db.select(Expense.change_seq)))) == 1
+    assert sum(statement.startswith("UPDATE users") for statement in statements) == 1
+
+
+def test_group_commit_response_matches_other_routes(make_app):
+    client = make_app(EXPENSES_GROUP_COMMIT="1").test_client()
+    response = client.post("/register", json={"name": "Test", "email": "test@example.com", "password": "secret"})
+    headers = {"Authorization": f"Bearer {response.json['token']}"}
+
+    created = client.post(
+        "/expenses", json={"amount": 12.5, "category": "food", "date": "2024-02-03"}, headers=headers
+    ).json["expense"]
+    listed = client.get("/expenses", headers=headers).json[0]
+
+    assert created["amount"] == "12.50"
+    assert created == listed
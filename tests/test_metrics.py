@@ -0,0 +1,33 @@
+import re
+
+from metrics import metrics
+
+
+def sample(name, route):
+    text = metrics.render()
+    match = re.search(rf'^{name}{{route="{re.escape(route)}"}} (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_streamed_export_is_counted_once_with_all_its_queries(client, auth_headers):
+    client.post("/expenses", json={"amount": 5, "category": "food", "date": "2024-01-01"}, headers=auth_headers)
+    route = "GET /expenses/export"
+    requests_before = sample("http_requests_total", route)
+    queries_before = sample("db_queries_total", route)
+
+    response = client.get("/expenses/export?format=csv", headers=auth_headers)
+    assert "food" in response.get_data(as_text=True)
+    response.close()
+
+    assert sample("http_requests_total", route) == requests_before + 1
+    # The export query runs inside the stream, after the view has returned
+    assert sample("db_queries_total", route) > queries_before
+
+
+def test_plain_responses_are_counted_once(client, auth_headers):
+    route = "GET /expenses/summary"
+    before = sample("http_requests_total", route)
+
+    client.get("/expenses/summary", headers=auth_headers).close()
+
+    assert sample("http_requests_total", route) == before + 1
@@ -0,0 +1,111 @@
+import shutil
+import sqlite3
+import time
+
+import pytest
+
+from extensions import db, replica_router
+
+
+@pytest.fixture(autouse=True)
+def replica_up(monkeypatch):
+    monkeypatch.setattr(replica_router, "_down_until", 0)
+
+
+@pytest.fixture
+def lagging_replica(make_app, tmp_path):
+    """An app whose replica is a copy of the primary, refreshed by calling `app.replicate()`."""
+    app = make_app(DATABASE_REPLICA_URL=f"sqlite:///{tmp_path / 'replica.db'}")
+
+    def replicate():
+        with app.app_context():
+            db.engines["replica"].dispose()
+        shutil.copy(tmp_path / "primary.db", tmp_path / "replica.db")
+
+    app.replicate = replicate
+    app.replica_path = tmp_path / "replica.db"
+    return app
+
+
+@pytest.fixture
+def unreachable_replica(make_app, tmp_path):
+    return make_app(DATABASE_REPLICA_URL=f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+
+
+def register(client):
+    response = client.post("/register", json={"name": "Test", "email": "test@example.com", "password": "secret"})
+    headers = {"Authorization": f"Bearer {response.json['token']}"}
+    client.post("/expenses", json={"amount": 5, "category": "food", "date": "2024-01-01"}, headers=headers)
+    return headers
+
+
+@pytest.mark.parametrize("path, accept", [
+    ("/expenses/export?format=csv", "*/*"),
+    ("/expenses", "application/x-ndjson"),
+])
+def test_streamed_reads_fall_back_when_replica_is_unreachable(unreachable_replica, path, accept):
+    client = unreachable_replica.test_client()
+    headers = register(client)
+
+    response = client.get(path, headers={**headers, "Accept": accept})
+
+    assert response.status_code == 200
+    assert "food" in response.get_data(as_text=True)
+    assert replica_router._down_until > time.monotonic()
+
+
+def descriptions(client, headers, **request):
+    response = client.get("/expenses", headers=headers, **request)
+    return response, sorted(expense["description"] for expense in response.json or [])
+
+
+def test_reads_see_own_writes_until_the_replica_catches_up(lagging_replica):
+    client = lagging_replica.test_client()
+    headers = register(client)
+    lagging_replica.replicate()
+    # Tag the replica's copy so the test can tell which database answered
+    with sqlite3.connect(lagging_replica.replica_path) as replica:
+        replica.execute("UPDATE expenses SET description = 'from replica'")
+
+    response, rows = descriptions(client, headers)
+    assert rows == ["from replica"]
+    etag = response.headers["ETag"]
+
+    client.post(
+        "/expenses", json={"amount": 7, "category": "rent", "description": "new", "date": "2024-01-02"}, headers=headers
+    )
+
+    # The replica still has the old version, so neither the body nor a 304 may come from it
+    response, rows = descriptions(client, headers, environ_overrides={"HTTP_IF_NONE_MATCH": etag})
+    assert response.status_code == 200
+    assert rows == ["", "new"]
+
+    lagging_replica.replicate()
+    with sqlite3.connect(lagging_replica.replica_path) as replica:
+        replica.execute("UPDATE expenses SET description = 'from replica'")
+    assert descriptions(client, headers)[1] == ["from replica", "from replica"]
+    assert replica_router._down_until == 0
+
+
+def test_core_writes_in_a_replica_read_go_to_the_primary(lagging_replica):
+    from flask import g
+    from sqlalchemy import select
+
+    from expense_cache import bump_expenses_version, get_expenses_version
+    from models import Expense, User
+
+    client = lagging_replica.test_client()
+    register(client)
+    lagging_replica.replicate()
+
+    with lagging_replica.test_request_context():
+        user_id = db.session.scalar(select(User.id))
+        before = get_expenses_version(user_id)
+        g.use_replica = True
+        assert db.session.get_bind(clause=select(Expense)) is db.engines["replica"]
+
+        bump_expenses_version(user_id)
+        db.session.commit()
+
+        assert get_expenses_version(user_id) == before + 1
+        assert get_expenses_version(user_id, bind=db.engines["replica"]) == before
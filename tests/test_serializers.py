@@ -0,0 +1,18 @@
+def test_write_and_read_paths_use_the_same_expense_format(client, auth_headers):
+    created = client.post(
+        "/expenses",
+        json={"amount": 12.5, "category": "food", "description": "lunch", "date": "2024-02-03"},
+        headers=auth_headers,
+    ).json["expense"]
+    updated = client.put(
+        f"/expenses/{created['id']}",
+        json={"amount": 13, "category": "food", "description": "lunch", "date": "2024-02-04"},
+        headers=auth_headers,
+    ).json["expense"]
+    listed = client.get("/expenses", headers=auth_headers).json[0]
+    synced = client.get("/expenses/changes", headers=auth_headers).json["changed"][0]
+
+    assert created["date"] == "2024-02-03"
+    assert updated == listed == synced
+    assert listed["date"] == "2024-02-04"
+    assert listed["amount"] == "13.00"